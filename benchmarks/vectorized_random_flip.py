@@ -21,6 +21,7 @@ from tensorflow import keras
 
 from keras_cv import bounding_box
 from keras_cv.backend import random
+from keras_cv.backend.config import keras_3
 from keras_cv.layers import RandomFlip
 from keras_cv.layers.preprocessing.base_image_augmentation_layer import (
     BaseImageAugmentationLayer,
@@ -31,6 +32,12 @@ from keras_cv.layers.preprocessing.vectorized_base_image_augmentation_layer impo
 from keras_cv.layers.preprocessing.vectorized_base_image_augmentation_layer import (  # noqa: E501
     IMAGES,
 )
+from keras_cv.layers.preprocessing.vectorized_base_image_augmentation_layer import (  # noqa: E501
+    KEYPOINTS,
+)
+from keras_cv.layers.preprocessing.vectorized_base_image_augmentation_layer import (  # noqa: E501
+    SEGMENTATION_MASKS,
+)
 
 # In order to support both unbatched and batched inputs, the horizontal
 # and vertical axis is reverse indexed
@@ -67,12 +74,22 @@ class OldRandomFlip(BaseImageAugmentationLayer):
         Refer to
         https://github.com/keras-team/keras-cv/blob/master/keras_cv/bounding_box/converters.py
         for more details on supported bounding box formats.
+      jit_compile: Boolean. Whether to compile the image and bounding box
+        flips of dense batches with XLA, defaults to `False`. Drawing the
+        flip decisions, the conversion of bounding boxes to and from ragged
+        tensors and batches of ragged images, which are flipped one sample
+        at a time, are not compiled.
     """
 
     def __init__(
-        self, mode=HORIZONTAL, seed=None, bounding_box_format=None, **kwargs
+        self,
+        mode=HORIZONTAL,
+        seed=None,
+        bounding_box_format=None,
+        jit_compile=False,
+        **kwargs,
     ):
-        super().__init__(seed=seed, force_generator=True, **kwargs)
+        super().__init__(seed=seed, **kwargs)
         self.mode = mode
         self.seed = seed
         if mode == HORIZONTAL:
@@ -89,82 +106,165 @@ class OldRandomFlip(BaseImageAugmentationLayer):
                 "RandomFlip layer {name} received an unknown mode="
                 "{arg}".format(name=self.name, arg=mode)
             )
-        self.auto_vectorize = True
         self.bounding_box_format = bounding_box_format
+        self.jit_compile = jit_compile
+        # Only the flips of dense batches are compiled: the `tf.cond`
+        # skipping the bounding box flip and `bounding_box.to_ragged` stay
+        # outside of XLA. The per-sample path used for ragged images keeps
+        # the plain methods, as XLA would compile again for every image size.
+        self._dense_flip_image = self._flip_image
+        self._dense_flip_bounding_boxes = self._flip_bounding_boxes
+        if jit_compile:
+            self._dense_flip_image = tf.function(
+                self._flip_image, jit_compile=True
+            )
+            self._dense_flip_bounding_boxes = tf.function(
+                self._flip_bounding_boxes, jit_compile=True
+            )
 
     def augment_label(self, label, transformation, **kwargs):
         return label
 
     def augment_image(self, image, transformation, **kwargs):
-        return OldRandomFlip._flip_image(image, transformation)
-
-    def get_random_transformation(self, **kwargs):
-        flip_horizontal = False
-        flip_vertical = False
+        return self._flip_image(image, transformation)
+
+    def get_random_transformation(self, batch_size=None, seed=None, **kwargs):
+        # When a `batch_size` is given, one decision is drawn per sample so
+        # that the whole batch can be flipped at once.
+        shape = [] if batch_size is None else [batch_size]
+        if seed is None:
+            seed = self._next_seed()
+        horizontal_seed, vertical_seed = tf.unstack(
+            tf.random.experimental.stateless_split(seed, num=2)
+        )
+        flip_horizontal = tf.zeros(shape, dtype=tf.bool)
+        flip_vertical = tf.zeros(shape, dtype=tf.bool)
         if self.horizontal:
             flip_horizontal = (
-                random.uniform(shape=[], seed=self._seed_generator) > 0.5
+                tf.random.stateless_uniform(shape=shape, seed=horizontal_seed)
+                > 0.5
             )
         if self.vertical:
             flip_vertical = (
-                random.uniform(shape=[], seed=self._seed_generator) > 0.5
+                tf.random.stateless_uniform(shape=shape, seed=vertical_seed)
+                > 0.5
             )
         return {
-            "flip_horizontal": tf.cast(flip_horizontal, dtype=tf.bool),
-            "flip_vertical": tf.cast(flip_vertical, dtype=tf.bool),
+            "flip_horizontal": flip_horizontal,
+            "flip_vertical": flip_vertical,
         }
 
-    def _flip_image(image, transformation):
-        flipped_output = tf.cond(
-            transformation["flip_horizontal"],
-            lambda: tf.image.flip_left_right(image),
-            lambda: image,
+    def _next_seed(self):
+        # Only one seed is taken per call from the layer's seed generator,
+        # the flip decisions are then sampled statelessly.
+        if keras_3():
+            return tf.cast(self._seed_generator.next(), tf.int64)
+        # Without Keras 3 the seed generator is a Python counter, which a
+        # traced function would capture as a constant. Drawing the seed with
+        # a stateful op keeps it changing on every call and every sample.
+        return tf.random.uniform(
+            [2],
+            maxval=tf.int64.max,
+            dtype=tf.int64,
+            seed=random.make_seed(self._seed_generator),
+        )
+
+    def _batch_augment(self, inputs):
+        images = inputs.get(IMAGES, None)
+        # Ragged images are flipped one sample at a time, and so are dense
+        # images when ragged outputs are forced, as only that path converts
+        # them. Keypoints take the same path, where `augment_keypoints`
+        # reports that they are not supported instead of passing them
+        # through unflipped.
+        if (
+            isinstance(images, tf.RaggedTensor)
+            or self.force_output_ragged_images
+            or KEYPOINTS in inputs
+        ):
+            return super()._batch_augment(inputs)
+
+        bounding_boxes = inputs.get(BOUNDING_BOXES, None)
+        segmentation_masks = inputs.get(SEGMENTATION_MASKS, None)
+        transformation = self.get_random_transformation(
+            batch_size=tf.shape(images)[0]
+        )
+        result = {IMAGES: self._dense_flip_image(images, transformation)}
+        if bounding_boxes is not None:
+            result[BOUNDING_BOXES] = bounding_box.to_ragged(
+                self._maybe_flip_bounding_boxes(
+                    bounding_box.to_dense(bounding_boxes),
+                    transformation,
+                    images,
+                    self._dense_flip_bounding_boxes,
+                ),
+                dtype=self.compute_dtype,
+            )
+        if segmentation_masks is not None:
+            result[SEGMENTATION_MASKS] = self._dense_flip_image(
+                segmentation_masks, transformation
+            )
+        # Flipping does not change labels, so they are passed through along
+        # with any other inputs rather than going through `augment_target`.
+        for key in inputs.keys() - result.keys():
+            result[key] = inputs[key]
+        return result
+
+    def _broadcast_flip(flip, rank):
+        # Per-sample decisions select whole samples of a batched input, a
+        # scalar decision applies to the whole unbatched input.
+        if flip.shape.rank == 0:
+            return flip
+        return tf.reshape(flip, [-1] + [1] * (rank - 1))
+
+    def _flip_image(self, image, transformation):
+        flip_horizontal = OldRandomFlip._broadcast_flip(
+            transformation["flip_horizontal"], image.shape.rank
         )
-        flipped_output = tf.cond(
-            transformation["flip_vertical"],
-            lambda: tf.image.flip_up_down(flipped_output),
-            lambda: flipped_output,
+        flip_vertical = OldRandomFlip._broadcast_flip(
+            transformation["flip_vertical"], image.shape.rank
         )
+        flipped_output = image
+        if self.horizontal:
+            flipped_output = tf.where(
+                flip_horizontal,
+                tf.reverse(flipped_output, axis=[W_AXIS]),
+                flipped_output,
+            )
+        if self.vertical:
+            flipped_output = tf.where(
+                flip_vertical,
+                tf.reverse(flipped_output, axis=[H_AXIS]),
+                flipped_output,
+            )
         flipped_output.set_shape(image.shape)
         return flipped_output
 
-    def _flip_bounding_boxes_horizontal(bounding_boxes):
-        x1, x2, x3, x4 = tf.split(
-            bounding_boxes["boxes"], [1, 1, 1, 1], axis=-1
-        )
-        output = tf.stack(
-            [
-                1 - x3,
-                x2,
-                1 - x1,
-                x4,
-            ],
-            axis=-1,
-        )
-        bounding_boxes = bounding_boxes.copy()
-        bounding_boxes["boxes"] = tf.squeeze(output, axis=1)
-        return bounding_boxes
+    def _flip_boxes_horizontal(boxes):
+        # [x1, y1, x2, y2] -> [1 - x2, y1, 1 - x1, y2]
+        sign = tf.constant([-1.0, 1.0, -1.0, 1.0], dtype=boxes.dtype)
+        bias = tf.constant([1.0, 0.0, 1.0, 0.0], dtype=boxes.dtype)
+        return sign * tf.gather(boxes, [2, 1, 0, 3], axis=-1) + bias
 
-    def _flip_bounding_boxes_vertical(bounding_boxes):
-        x1, x2, x3, x4 = tf.split(
-            bounding_boxes["boxes"], [1, 1, 1, 1], axis=-1
-        )
-        output = tf.stack(
-            [
-                x1,
-                1 - x4,
-                x3,
-                1 - x2,
-            ],
-            axis=-1,
-        )
-        output = tf.squeeze(output, axis=1)
-        bounding_boxes = bounding_boxes.copy()
-        bounding_boxes["boxes"] = output
-        return bounding_boxes
+    def _flip_boxes_vertical(boxes):
+        # [x1, y1, x2, y2] -> [x1, 1 - y2, x2, 1 - y1]
+        sign = tf.constant([1.0, -1.0, 1.0, -1.0], dtype=boxes.dtype)
+        bias = tf.constant([0.0, 1.0, 0.0, 1.0], dtype=boxes.dtype)
+        return sign * tf.gather(boxes, [0, 3, 2, 1], axis=-1) + bias
 
     def augment_bounding_boxes(
         self, bounding_boxes, transformation=None, image=None, **kwargs
+    ):
+        return bounding_box.to_ragged(
+            self._maybe_flip_bounding_boxes(
+                bounding_boxes,
+                transformation,
+                image,
+                self._flip_bounding_boxes,
+            )
+        )
+
+    def _maybe_flip_bounding_boxes(
+        self, bounding_boxes, transformation, image, flip_bounding_boxes
     ):
         if self.bounding_box_format is None:
             raise ValueError(
@@ -173,43 +273,83 @@ class OldRandomFlip(BaseImageAugmentationLayer):
                 "Please specify a bounding box format in the constructor. i.e."
                 "`RandomFlip(bounding_box_format='xyxy')`"
             )
-        bounding_boxes = bounding_boxes.copy()
-        bounding_boxes = bounding_box.convert_format(
-            bounding_boxes,
+        # When no sample is flipped the boxes are returned as is, skipping
+        # the round trip through the relative box format.
+        return tf.cond(
+            tf.reduce_any(
+                tf.logical_or(
+                    transformation["flip_horizontal"],
+                    transformation["flip_vertical"],
+                )
+            ),
+            lambda: flip_bounding_boxes(bounding_boxes, transformation, image),
+            lambda: bounding_boxes,
+        )
+
+    def _flip_bounding_boxes(self, bounding_boxes, transformation, image):
+        # `convert_format` updates dicts in place, so only the boxes tensor
+        # is converted and the result dict is built once at the end. This
+        # leaves the caller's dict, which the other `tf.cond` branch returns,
+        # untouched.
+        boxes = bounding_box.convert_format(
+            bounding_boxes["boxes"],
             source=self.bounding_box_format,
             target="rel_xyxy",
             images=image,
         )
-        bounding_boxes = tf.cond(
-            transformation["flip_horizontal"],
-            lambda: OldRandomFlip._flip_bounding_boxes_horizontal(
-                bounding_boxes
+        rank = boxes.shape.rank
+        boxes = tf.where(
+            OldRandomFlip._broadcast_flip(
+                transformation["flip_horizontal"], rank
             ),
-            lambda: bounding_boxes,
+            OldRandomFlip._flip_boxes_horizontal(boxes),
+            boxes,
         )
-        bounding_boxes = tf.cond(
-            transformation["flip_vertical"],
-            lambda: OldRandomFlip._flip_bounding_boxes_vertical(bounding_boxes),
-            lambda: bounding_boxes,
+        boxes = tf.where(
+            OldRandomFlip._broadcast_flip(
+                transformation["flip_vertical"], rank
+            ),
+            OldRandomFlip._flip_boxes_vertical(boxes),
+            boxes,
         )
-        bounding_boxes = bounding_box.clip_to_image(
-            bounding_boxes,
+        # Only flipped samples take their clipped boxes, so unflipped samples
+        # are left untouched just like when nothing in the batch is flipped.
+        # This is for consistency, not speed: the whole batch is still
+        # clipped, and the two selects below come on top of that.
+        flipped = tf.logical_or(
+            transformation["flip_horizontal"], transformation["flip_vertical"]
+        )
+        clipped_bounding_boxes = bounding_box.clip_to_image(
+            {"boxes": boxes, "classes": bounding_boxes["classes"]},
             bounding_box_format="rel_xyxy",
             images=image,
         )
-        bounding_boxes = bounding_box.convert_format(
-            bounding_boxes,
-            source="rel_xyxy",
-            target=self.bounding_box_format,
-            dtype=self.compute_dtype,
-            images=image,
+        boxes = tf.where(
+            OldRandomFlip._broadcast_flip(flipped, rank),
+            clipped_bounding_boxes["boxes"],
+            boxes,
         )
-        return bounding_box.to_ragged(bounding_boxes)
+        classes = tf.where(
+            OldRandomFlip._broadcast_flip(flipped, rank - 1),
+            clipped_bounding_boxes["classes"],
+            bounding_boxes["classes"],
+        )
+        return {
+            **bounding_boxes,
+            "boxes": bounding_box.convert_format(
+                boxes,
+                source="rel_xyxy",
+                target=self.bounding_box_format,
+                dtype=self.compute_dtype,
+                images=image,
+            ),
+            "classes": classes,
+        }
 
     def augment_segmentation_mask(
         self, segmentation_mask, transformation=None, **kwargs
     ):
-        return OldRandomFlip._flip_image(segmentation_mask, transformation)
+        return self._flip_image(segmentation_mask, transformation)
 
     def compute_output_shape(self, input_shape):
         return input_shape
@@ -219,6 +359,7 @@ class OldRandomFlip(BaseImageAugmentationLayer):
             "mode": self.mode,
             "seed": self.seed,
             "bounding_box_format": self.bounding_box_format,
+            "jit_compile": self.jit_compile,
         }
         base_config = super().get_config()
         return dict(list(base_config.items()) + list(config.items()))
@@ -243,14 +384,162 @@ class RandomFlipTest(tf.test.TestCase):
         ):
             output = layer(image)
         with unittest.mock.patch.object(
-            random,
-            "uniform",
+            tf.random,
+            "stateless_uniform",
             return_value=tf.convert_to_tensor(0.6),
         ):
             old_output = old_layer(image)
 
         self.assertAllClose(old_output, output)
 
+    def test_unflipped_bounding_boxes_are_not_clipped(self):
+        images = tf.zeros(shape=(2, 10, 10, 3))
+        bounding_boxes = {
+            "boxes": tf.constant(
+                [[[2.0, 2.0, 12.0, 8.0]], [[2.0, 2.0, 12.0, 8.0]]]
+            ),
+            "classes": tf.constant([[0.0], [0.0]]),
+        }
+        layer = OldRandomFlip(
+            mode=HORIZONTAL_AND_VERTICAL, bounding_box_format="xyxy"
+        )
+
+        # Flip the first sample along both axes, keep the second one as is.
+        with unittest.mock.patch.object(
+            tf.random,
+            "stateless_uniform",
+            return_value=tf.constant([0.6, 0.4]),
+        ):
+            outputs = layer(
+                {"images": images, "bounding_boxes": bounding_boxes}
+            )
+
+        boxes = outputs["bounding_boxes"]["boxes"].to_tensor()
+        self.assertAllClose(boxes[0], [[0.0, 2.0, 8.0, 8.0]])
+        self.assertAllClose(boxes[1], [[2.0, 2.0, 12.0, 8.0]])
+
+    def test_keypoints_are_not_supported(self):
+        layer = OldRandomFlip()
+        with self.assertRaises(NotImplementedError):
+            layer(
+                {
+                    "images": tf.zeros(shape=(2, 10, 10, 3)),
+                    "keypoints": tf.zeros(shape=(2, 4, 2)),
+                }
+            )
+
+    def test_labels_are_passed_through(self):
+        labels = tf.constant([[1.0], [2.0]])
+        layer = OldRandomFlip()
+        outputs = layer(
+            {"images": tf.zeros(shape=(2, 10, 10, 3)), "labels": labels}
+        )
+        self.assertAllClose(outputs["labels"], labels)
+
+    def test_jit_compile_with_ragged_images(self):
+        images = tf.ragged.stack(
+            [
+                tf.random.uniform(shape=(4, 4, 3)),
+                tf.random.uniform(shape=(6, 5, 3)),
+            ]
+        )
+        layer = OldRandomFlip(mode=HORIZONTAL_AND_VERTICAL, jit_compile=True)
+
+        with unittest.mock.patch.object(
+            tf.random,
+            "stateless_uniform",
+            return_value=tf.convert_to_tensor(0.6),
+        ):
+            outputs = layer(images)
+
+        self.assertIsInstance(outputs, tf.RaggedTensor)
+        for image, output in zip(images, outputs):
+            self.assertAllClose(
+                output.to_tensor(), tf.reverse(image.to_tensor(), axis=[0, 1])
+            )
+
+    def test_force_output_ragged_images(self):
+        layer = OldRandomFlip()
+        layer.force_output_ragged_images = True
+        outputs = layer(tf.zeros(shape=(2, 10, 10, 3)))
+        self.assertIsInstance(outputs, tf.RaggedTensor)
+
+    def test_flip_decisions_change_across_traced_calls(self):
+        images = tf.reshape(tf.range(8, dtype=tf.float32), (1, 2, 4, 1))
+        images = tf.tile(images, [8, 1, 1, 1])
+        layer = OldRandomFlip(mode=HORIZONTAL)
+
+        @tf.function
+        def apply_layer(images):
+            return layer(images)
+
+        outputs = [apply_layer(images) for _ in range(5)]
+        self.assertTrue(
+            any(
+                not np.array_equal(outputs[0], output) for output in outputs[1:]
+            )
+        )
+
+    def test_flip_decisions_differ_across_ragged_samples(self):
+        image = tf.reshape(tf.range(8, dtype=tf.float32), (2, 4, 1))
+        images = tf.ragged.stack([image] * 32)
+        layer = OldRandomFlip(mode=HORIZONTAL)
+
+        @tf.function
+        def apply_layer(images):
+            return layer(images)
+
+        outputs = apply_layer(images).to_tensor()
+        self.assertTrue(
+            any(
+                not np.array_equal(outputs[0], output) for output in outputs[1:]
+            )
+        )
+
+    def test_jit_compile_matches_non_jit(self):
+        images = tf.random.uniform(shape=(4, 10, 10, 3))
+        boxes = tf.constant([[[2.0, 2.0, 12.0, 8.0]]] * 4)
+        classes = tf.zeros(shape=(4, 1))
+        layer = OldRandomFlip(
+            mode=HORIZONTAL_AND_VERTICAL, bounding_box_format="xyxy"
+        )
+        jit_layer = OldRandomFlip(
+            mode=HORIZONTAL_AND_VERTICAL,
+            bounding_box_format="xyxy",
+            jit_compile=True,
+        )
+
+        # Cover every combination of horizontal and vertical flips.
+        horizontal = tf.constant([0.6, 0.6, 0.4, 0.4])
+        vertical = tf.constant([0.6, 0.4, 0.6, 0.4])
+        with unittest.mock.patch.object(
+            tf.random,
+            "stateless_uniform",
+            side_effect=[horizontal, vertical, horizontal, vertical],
+        ):
+            outputs = layer(
+                {
+                    "images": images,
+                    "bounding_boxes": {"boxes": boxes, "classes": classes},
+                }
+            )
+            jit_outputs = jit_layer(
+                {
+                    "images": images,
+                    "bounding_boxes": {"boxes": boxes, "classes": classes},
+                }
+            )
+
+        self.assertAllClose(outputs["images"], jit_outputs["images"])
+        self.assertAllClose(
+            outputs["bounding_boxes"]["boxes"].to_tensor(),
+            jit_outputs["bounding_boxes"]["boxes"].to_tensor(),
+        )
+        self.assertAllClose(
+            outputs["bounding_boxes"]["classes"].to_tensor(),
+            jit_outputs["bounding_boxes"]["classes"].to_tensor(),
+        )
+
 
 if __name__ == "__main__":
     # Run benchmark
@@ -259,6 +548,9 @@ if __name__ == "__main__":
 
     is_inputs_containing_bounding_boxes = False
     num_images = [100, 200, 500, 1000]
+    # Batches smaller than `n_images` let the parallel map and prefetch
+    # overlap work in tf.data mode.
+    tf_data_batch_size = 50
     results = {}
     aug_candidates = [RandomFlip, OldRandomFlip]
     aug_args = {
@@ -266,6 +558,32 @@ if __name__ == "__main__":
         "bounding_box_format": "xyxy",
     }
 
+    # Convert the inputs to tensors once, so that neither the numpy slicing
+    # nor the host to device copy ends up in the timings.
+    images = tf.constant(x_train[: max(num_images)])
+
+    def get_inputs(n_images):
+        inputs = {IMAGES: images[:n_images]}
+        if is_inputs_containing_bounding_boxes:
+            inputs.update(
+                {
+                    BOUNDING_BOXES: {
+                        "classes": tf.zeros(shape=(n_images, 4)),
+                        "boxes": tf.zeros(shape=(n_images, 4, 4)),
+                    }
+                }
+            )
+        return inputs
+
+    # Leave the batch dimension unknown so that graph mode traces once for
+    # all of `num_images`.
+    input_signature = [
+        tf.nest.map_structure(
+            lambda x: tf.TensorSpec([None] + x.shape[1:], x.dtype),
+            get_inputs(num_images[0]),
+        )
+    ]
+
     for aug in aug_candidates:
         # Eager Mode
         c = aug.__name__
@@ -274,16 +592,7 @@ if __name__ == "__main__":
         print(f"Timing {c}")
 
         for n_images in num_images:
-            inputs = {IMAGES: x_train[:n_images]}
-            if is_inputs_containing_bounding_boxes:
-                inputs.update(
-                    {
-                        BOUNDING_BOXES: {
-                            "classes": tf.zeros(shape=(n_images, 4)),
-                            "boxes": tf.zeros(shape=(n_images, 4, 4)),
-                        }
-                    }
-                )
+            inputs = get_inputs(n_images)
             # warmup
             layer(inputs)
 
@@ -298,7 +607,7 @@ if __name__ == "__main__":
         c = aug.__name__ + " Graph Mode"
         layer = aug(**aug_args)
 
-        @tf.function()
+        @tf.function(input_signature=input_signature)
         def apply_aug(inputs):
             return layer(inputs)
 
@@ -306,16 +615,7 @@ if __name__ == "__main__":
         print(f"Timing {c}")
 
         for n_images in num_images:
-            inputs = {IMAGES: x_train[:n_images]}
-            if is_inputs_containing_bounding_boxes:
-                inputs.update(
-                    {
-                        BOUNDING_BOXES: {
-                            "classes": tf.zeros(shape=(n_images, 4)),
-                            "boxes": tf.zeros(shape=(n_images, 4, 4)),
-                        }
-                    }
-                )
+            inputs = get_inputs(n_images)
             # warmup
             apply_aug(inputs)
 
@@ -327,13 +627,10 @@ if __name__ == "__main__":
         results[c] = runtimes
 
         # XLA Mode
-        # OldRandomFlip fails to run on XLA
-        if aug is OldRandomFlip:
-            continue
         c = aug.__name__ + " XLA Mode"
         layer = aug(**aug_args)
 
-        @tf.function(jit_compile=True)
+        @tf.function(input_signature=input_signature, jit_compile=True)
         def apply_aug(inputs):
             return layer(inputs)
 
@@ -341,17 +638,8 @@ if __name__ == "__main__":
         print(f"Timing {c}")
 
         for n_images in num_images:
-            inputs = {IMAGES: x_train[:n_images]}
-            if is_inputs_containing_bounding_boxes:
-                inputs.update(
-                    {
-                        BOUNDING_BOXES: {
-                            "classes": tf.zeros(shape=(n_images, 4)),
-                            "boxes": tf.zeros(shape=(n_images, 4, 4)),
-                        }
-                    }
-                )
-            # warmup
+            inputs = get_inputs(n_images)
+            # warmup, XLA compiles once per input shape
             apply_aug(inputs)
 
             t0 = time.time()
@@ -361,6 +649,31 @@ if __name__ == "__main__":
             print(f"Runtime for {c}, n_images={n_images}: {t1-t0}")
         results[c] = runtimes
 
+        # tf.data Mode
+        c = aug.__name__ + " tf.data Mode"
+        layer = aug(**aug_args)
+        runtimes = []
+        print(f"Timing {c}")
+
+        for n_images in num_images:
+            dataset = (
+                tf.data.Dataset.from_tensor_slices(get_inputs(n_images))
+                .batch(tf_data_batch_size)
+                .map(layer, num_parallel_calls=tf.data.AUTOTUNE)
+                .prefetch(tf.data.AUTOTUNE)
+            )
+            # warmup
+            for _ in dataset:
+                pass
+
+            t0 = time.time()
+            for _ in dataset:
+                pass
+            t1 = time.time()
+            runtimes.append(t1 - t0)
+            print(f"Runtime for {c}, n_images={n_images}: {t1-t0}")
+        results[c] = runtimes
+
     plt.figure()
     for key in results:
         plt.plot(num_images, results[key], label=key)
@@ -325,13 +325,12 @@ class RandomFrequencyPositionalEmbeddings(keras.layers.Layer):
         Returns:
             tensor: Positional encodings of the normalized coordinates.
         """
-        coords_normalized = ops.stack(
-            [
-                coords_input[..., 0] / image_size[1],
-                coords_input[..., 1] / image_size[0],
-            ],
-            axis=-1,
+        # Divide the interleaved (x, y) pairs by (W, H) in one broadcast
+        # instead of slicing out and re-stacking each coordinate.
+        image_size = ops.convert_to_tensor(
+            [image_size[1], image_size[0]], dtype=self.dtype
         )
+        coords_normalized = ops.cast(coords_input, self.dtype) / image_size
         return self.__positional_encodings(coords_normalized)
 
     def get_config(self):
@@ -13,12 +13,21 @@
 # limitations under the License.
 
 from keras_cv.api_export import keras_cv_export
+from keras_cv.backend import config
 from keras_cv.backend import keras
 from keras_cv.backend import ops
 from keras_cv.models.segmentation.segment_anything.sam_layers import (
     RandomFrequencyPositionalEmbeddings,
 )
 
+# Rows of the stacked sparse prompt embedding table, see
+# `SAMPromptEncoder.__sparse_embedding_table`.
+FOREGROUND_POINT = 0
+BACKGROUND_POINT = 1
+TOP_LEFT_CORNER = 2
+BOTTOM_RIGHT_CORNER = 3
+NOT_A_POINT = 4
+
 
 @keras_cv_export("keras_cv.models.SAMPromptEncoder", package="keras_cv.models")
 class SAMPromptEncoder(keras.layers.Layer):
@@ -50,6 +59,9 @@ class SAMPromptEncoder(keras.layers.Layer):
     If a mask prompt is passed, a convolutional neural net is used to
     downscale it to generate "dense encodings". If no mask prompt is passed,
     an embedding layer is used instead to generate a "no mask" embedding.
+    When it is known ahead of time that no mask prompt was passed, the "no
+    mask" embedding is returned with shape `(1, 1, 1, embed_dim)` and left to
+    broadcast against the image embeddings in the mask decoder.
 
     Args:
         embed_dim (int, optional): The number of features in the output
@@ -63,6 +75,18 @@ class SAMPromptEncoder(keras.layers.Layer):
             prompt. Defaults to `16`.
         activation (str, optional): The activation to use in the mask
             downscaler neural net. Defaults to `"gelu"`.
+        jit_compile (bool, optional): Whether to compile the mask downscaler
+            with XLA so that its convolution, normalization and activation
+            layers are fused. Only used with the TensorFlow backend.
+            Defaults to `False`.
+        mask_downscaler_dtype (str or dtype policy, optional): The dtype
+            policy used by the strided convolution, normalization and
+            activation layers of the mask downscaler, e.g.
+            `"mixed_bfloat16"` to halve the memory traffic of the full
+            resolution stages. Policies are stored by name. The final 1x1
+            convolution keeps the default dtype policy, so the dense
+            embeddings are still produced at full precision. Defaults to
+            `None`, which uses the default dtype policy throughout.
 
     References:
         - [Segment Anything paper](https://arxiv.org/abs/2304.02643)
@@ -77,6 +101,8 @@ class SAMPromptEncoder(keras.layers.Layer):
         input_image_size=(1024, 1024),
         mask_in_chans=16,
         activation="gelu",
+        jit_compile=False,
+        mask_downscaler_dtype=None,
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -85,6 +111,13 @@ class SAMPromptEncoder(keras.layers.Layer):
         self.input_image_size = input_image_size
         self.mask_in_chans = mask_in_chans
         self.activation = activation
+        self.jit_compile = jit_compile
+        # Dtype policies are stored by name to keep `get_config` serializable.
+        if mask_downscaler_dtype is not None:
+            mask_downscaler_dtype = getattr(
+                mask_downscaler_dtype, "name", mask_downscaler_dtype
+            )
+        self.mask_downscaler_dtype = mask_downscaler_dtype
 
         self.positional_embedding_layer = RandomFrequencyPositionalEmbeddings(
             num_positional_features=self.embed_dim // 2, scale=1
@@ -109,17 +142,40 @@ class SAMPromptEncoder(keras.layers.Layer):
         self.mask_downscaler = keras.models.Sequential(
             [
                 keras.layers.Conv2D(
-                    mask_in_chans // 4, kernel_size=2, strides=2
+                    mask_in_chans // 4,
+                    kernel_size=2,
+                    strides=2,
+                    dtype=mask_downscaler_dtype,
+                ),
+                keras.layers.LayerNormalization(
+                    epsilon=1e-6, dtype=mask_downscaler_dtype
+                ),
+                keras.layers.Activation(
+                    activation, dtype=mask_downscaler_dtype
+                ),
+                keras.layers.Conv2D(
+                    mask_in_chans,
+                    kernel_size=2,
+                    strides=2,
+                    dtype=mask_downscaler_dtype,
+                ),
+                keras.layers.LayerNormalization(
+                    epsilon=1e-6, dtype=mask_downscaler_dtype
+                ),
+                keras.layers.Activation(
+                    activation, dtype=mask_downscaler_dtype
                 ),
-                keras.layers.LayerNormalization(epsilon=1e-6),
-                keras.layers.Activation(activation),
-                keras.layers.Conv2D(mask_in_chans, kernel_size=2, strides=2),
-                keras.layers.LayerNormalization(epsilon=1e-6),
-                keras.layers.Activation(activation),
                 keras.layers.Conv2D(embed_dim, kernel_size=1),
             ],
             name="mask_downscaler",
         )
+        self._jit_mask_downscaler = None
+        if jit_compile and config.backend() == "tensorflow":
+            import tensorflow as tf
+
+            self._jit_mask_downscaler = tf.function(
+                self.mask_downscaler, jit_compile=True
+            )
         self.no_mask_embed = keras.layers.Embedding(
             1, embed_dim, name="no_mask_embed"
         )
@@ -148,12 +204,9 @@ class SAMPromptEncoder(keras.layers.Layer):
     def compute_output_shape(self, input_shape):
         return {
             "sparse_embeddings": [None, None, self.embed_dim],
-            "dense_embeddings": [
-                None,
-                self.image_embedding_size[0],
-                self.image_embedding_size[1],
-                self.embed_dim,
-            ],
+            # Without a mask prompt the dense embeddings are returned with
+            # shape `(1, 1, 1, embed_dim)`, see `call`.
+            "dense_embeddings": [None, None, None, self.embed_dim],
             "dense_positional_embeddings": [
                 None,
                 self.image_embedding_size[0],
@@ -162,51 +215,62 @@ class SAMPromptEncoder(keras.layers.Layer):
             ],
         }
 
-    def __embed_points(self, points, labels):
-        points = points + 0.5
-        indices = ops.arange(1, dtype="int32")
-
-        point_embeddings = self.positional_embedding_layer.encode_coordinates(
-            points, self.input_image_size
-        )
-        labels = ops.broadcast_to(
-            labels[..., None], ops.shape(point_embeddings)
-        )
-        point_embeddings = ops.where(
-            labels == 0,
-            point_embeddings + self.background_point_embed(indices),
-            point_embeddings + self.foreground_point_embed(indices),
+    def __sparse_embedding_table(self):
+        # The point and corner embeddings stay separate layers so that
+        # existing checkpoints keep loading, but they are read as a single
+        # `(5, embed_dim)` table indexed by the constants above.
+        return ops.concatenate(
+            [
+                self.foreground_point_embed.embeddings,
+                self.background_point_embed.embeddings,
+                self.top_left_corner_embed.embeddings,
+                self.bottom_right_corner_embed.embeddings,
+                self.not_a_point_embed.embeddings,
+            ],
+            axis=0,
         )
-        point_embeddings = ops.where(
-            labels == -1,
-            self.not_a_point_embed(indices),
-            point_embeddings,
+
+    def __embed_points(self, point_embeddings, labels, embedding_table):
+        # Gather one learned offset per point so that every element needs a
+        # single add and a single select against the not-a-point embedding.
+        offsets = ops.take(
+            embedding_table,
+            ops.where(labels == 0, BACKGROUND_POINT, FOREGROUND_POINT),
+            axis=0,
         )
-        return point_embeddings
-
-    def __embed_box(self, box):
-        shape = ops.shape(box)
-        B, N = shape[0], shape[1]
-        box = box + 0.5
-        indices = ops.arange(1, dtype="int32")
-        corner_embedding = self.positional_embedding_layer.encode_coordinates(
-            box, self.input_image_size
+        return ops.where(
+            labels[..., None] == -1,
+            embedding_table[NOT_A_POINT],
+            point_embeddings + offsets,
         )
-        top_left_embedding = corner_embedding[
-            :, :, 0, :
-        ] + self.top_left_corner_embed(indices)
-        bottom_right_embedding = corner_embedding[
-            :, :, 1, :
-        ] + self.bottom_right_corner_embed(indices)
-        corner_embedding = ops.stack(
-            [top_left_embedding, bottom_right_embedding], axis=2
+
+    def __embed_box(self, corner_embedding, embedding_table):
+        shape = ops.shape(corner_embedding)
+        B, N = shape[0], shape[1] // 2
+        # The corners of each box are adjacent, so both learned corner
+        # embeddings are added with a single broadcast.
+        corner_embedding = (
+            ops.reshape(corner_embedding, (B, N, 2, self.embed_dim))
+            + embedding_table[TOP_LEFT_CORNER : BOTTOM_RIGHT_CORNER + 1]
         )
         return ops.reshape(corner_embedding, (B, N * 2, self.embed_dim))
 
     def __embed_mask(self, mask):
+        if self._jit_mask_downscaler is not None:
+            return self._jit_mask_downscaler(mask)
         mask_embedding = self.mask_downscaler(mask)
         return mask_embedding
 
+    def __embed_masks(self, mask):
+        shape = ops.shape(mask)
+        B, N, H, W, C = shape[0], shape[1], shape[2], shape[3], shape[4]
+        return self.__embed_mask(ops.reshape(mask, (B * N, H, W, C)))
+
+    def __embed_no_mask(self):
+        return ops.reshape(
+            self.no_mask_embed.embeddings, (1, 1, 1, self.embed_dim)
+        )
+
     def call(self, inputs):
         # Get the batch shape based on any arbitrary input, because batch
         # shapes must all match.
@@ -217,24 +281,52 @@ class SAMPromptEncoder(keras.layers.Layer):
         box = inputs.get("boxes", ops.zeros((B, 0, 2, 2)))
         mask = inputs.get("masks", ops.zeros((B, 0, 256, 256, 1)))
 
+        # Positionally encode the points and the box corners in a single
+        # call, then split the encodings back into points and boxes.
+        num_points = ops.shape(points)[1]
+        num_boxes = ops.shape(box)[1]
+        coordinates = ops.concatenate(
+            [
+                ops.cast(points, self.dtype),
+                ops.cast(ops.reshape(box, (B, num_boxes * 2, 2)), self.dtype),
+            ],
+            axis=1,
+        )
+        coordinate_embeddings = (
+            self.positional_embedding_layer.encode_coordinates(
+                coordinates + 0.5, self.input_image_size
+            )
+        )
+
+        embedding_table = self.__sparse_embedding_table()
+
         # Compute point embeddings
-        point_embeddings = self.__embed_points(points, labels)
+        point_embeddings = self.__embed_points(
+            coordinate_embeddings[:, :num_points], labels, embedding_table
+        )
 
         # Compute box embeddings
-        box_embeddings = self.__embed_box(box)
+        box_embeddings = self.__embed_box(
+            coordinate_embeddings[:, num_points:], embedding_table
+        )
 
         # Concatenate both into a sparse embeddings tensor
         sparse_embeddings = ops.concatenate(
             [point_embeddings, box_embeddings], axis=1
         )
 
-        # Compute the mask embeddings
-        _no_mask_embed = lambda: (
-            ops.broadcast_to(
-                ops.reshape(
-                    self.no_mask_embed(ops.arange(1, dtype="int32")),
-                    (1, 1, 1, self.embed_dim),
-                ),
+        # Compute the mask embeddings. Whether a mask prompt was passed is
+        # almost always known statically, in which case we dispatch in
+        # Python instead of tracing both branches of a conditional.
+        if mask.shape[1] == 0:
+            dense_embeddings = self.__embed_no_mask()
+        elif mask.shape[1] is not None:
+            dense_embeddings = self.__embed_masks(mask)
+        else:
+            # Both branches of the conditional need to produce the same
+            # shape, so the "no mask" embedding is broadcast here.
+            _no_mask_embed = lambda: ops.broadcast_to(
+                self.__embed_no_mask(),
                 shape=(
                     B,
                     self.image_embedding_size[0],
@@ -242,37 +334,21 @@ class SAMPromptEncoder(keras.layers.Layer):
                     self.embed_dim,
                 ),
             )
-        )
 
-        def _maybe_input_mask_embed():
-            # Keras Core passes the masks as concrete tensors for both the
-            # true and false functions to build the output shape. So, we
-            # need to handle the case when 0 size mask is passed and
-            # dispatch the call to `_no_mask_embed`. Note that we can't call
-            # the lambda directly since the inputs are bound to different
-            # values when called with concrete values.
-            if mask.shape[1] == 0:
-                return ops.broadcast_to(
-                    ops.reshape(
-                        self.no_mask_embed(ops.arange(1, dtype="int32")),
-                        (1, 1, 1, self.embed_dim),
-                    ),
-                    shape=(
-                        B,
-                        self.image_embedding_size[0],
-                        self.image_embedding_size[1],
-                        self.embed_dim,
-                    ),
-                )
-            shape = ops.shape(mask)
-            BM, N, H, W, C = shape[0], shape[1], shape[2], shape[3], shape[4]
-            return self.__embed_mask(ops.reshape(mask, (BM * N, H, W, C)))
-
-        dense_embeddings = ops.cond(
-            ops.equal(ops.size(mask), 0),
-            _no_mask_embed,
-            _maybe_input_mask_embed,
-        )
+            def _maybe_input_mask_embed():
+                # Keras Core passes the masks as concrete tensors for both
+                # the true and false functions to build the output shape.
+                # So, we need to handle the case when 0 size mask is passed
+                # and dispatch the call to `_no_mask_embed`.
+                if mask.shape[1] == 0:
+                    return _no_mask_embed()
+                return self.__embed_masks(mask)
+
+            dense_embeddings = ops.cond(
+                ops.equal(ops.size(mask), 0),
+                _no_mask_embed,
+                _maybe_input_mask_embed,
+            )
 
         # Compute the dense positional embeddings
         dense_positional_embeddings = (
@@ -296,6 +372,8 @@ class SAMPromptEncoder(keras.layers.Layer):
                 "input_image_size": self.input_image_size,
                 "mask_in_chans": self.mask_in_chans,
                 "activation": self.activation,
+                "jit_compile": self.jit_compile,
+                "mask_downscaler_dtype": self.mask_downscaler_dtype,
             }
         )
         return config
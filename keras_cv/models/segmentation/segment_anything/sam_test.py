@@ -20,6 +20,7 @@ import numpy as np
 import pytest
 from absl.testing import parameterized
 
+from keras_cv.backend import config
 from keras_cv.backend import keras
 from keras_cv.backend import ops
 from keras_cv.models.backbones.vit_det.vit_det_aliases import ViTDetBBackbone
@@ -87,6 +88,18 @@ class SAMTest(TestCase):
 
         return prompts_dict
 
+    def _clone_prompt_encoder(self, **kwargs):
+        prompt_encoder = SAMPromptEncoder(
+            embed_dim=256,
+            image_embedding_size=(64, 64),
+            input_image_size=(1024, 1024),
+            mask_in_chans=16,
+            **kwargs,
+        )
+        prompt_encoder.build()
+        prompt_encoder.set_weights(self.prompt_encoder.get_weights())
+        return prompt_encoder
+
     def test_prompt_encoder_simple(self):
         outputs = self.prompt_encoder(self.get_prompts(7))
         sparse_embeddings, dense_embeddings, dense_positional_embeddings = (
@@ -114,6 +127,48 @@ class SAMTest(TestCase):
         self.assertEqual(trainable_parameters, 6_220)
         self.assertEqual(num_parameters, 6_476)
 
+    def test_prompt_encoder_jit_compile(self):
+        if config.backend() != "tensorflow":
+            pytest.skip("`jit_compile` only applies to the TensorFlow backend.")
+        prompts = self.get_prompts(2, "masks")
+        outputs = self.prompt_encoder(prompts)
+        jit_prompt_encoder = self._clone_prompt_encoder(jit_compile=True)
+        jit_outputs = jit_prompt_encoder(prompts)
+        self.assertAllClose(
+            outputs["dense_embeddings"],
+            jit_outputs["dense_embeddings"],
+            atol=1e-5,
+        )
+
+    def test_prompt_encoder_mask_downscaler_dtype(self):
+        prompts = self.get_prompts(2, "masks")
+        outputs = self.prompt_encoder(prompts)
+        bf16_prompt_encoder = self._clone_prompt_encoder(
+            mask_downscaler_dtype="mixed_bfloat16"
+        )
+        bf16_outputs = bf16_prompt_encoder(prompts)
+        self.assertEqual(
+            ops.convert_to_numpy(bf16_outputs["dense_embeddings"]).dtype,
+            ops.convert_to_numpy(outputs["dense_embeddings"]).dtype,
+        )
+        self.assertAllClose(
+            outputs["dense_embeddings"],
+            bf16_outputs["dense_embeddings"],
+            atol=5e-2,
+            rtol=5e-2,
+        )
+
+    def test_prompt_encoder_mask_downscaler_dtype_policy_config(self):
+        prompt_encoder = SAMPromptEncoder(
+            mask_downscaler_dtype=keras.mixed_precision.Policy("mixed_bfloat16")
+        )
+        prompt_encoder_config = prompt_encoder.get_config()
+        self.assertEqual(
+            prompt_encoder_config["mask_downscaler_dtype"], "mixed_bfloat16"
+        )
+        restored = SAMPromptEncoder.from_config(prompt_encoder_config)
+        self.assertEqual(restored.mask_downscaler_dtype, "mixed_bfloat16")
+
     @parameterized.named_parameters(
         [
             ("_".join(x), x)
@@ -140,14 +195,27 @@ class SAMTest(TestCase):
             sparse_embeddings.shape,
             (7, sparse_embeddings_dim, 256),
         )
-        self.assertAllEqual(dense_embeddings.shape, (7, 64, 64, 256))
-        if "masks" not in prompts:
-            no_mask_embed = ops.broadcast_to(
+        if "masks" in prompts:
+            self.assertAllEqual(dense_embeddings.shape, (7, 64, 64, 256))
+        else:
+            # The "no mask" embedding is left to broadcast downstream.
+            self.assertAllEqual(dense_embeddings.shape, (1, 1, 1, 256))
+            no_mask_embed = ops.reshape(
                 self.prompt_encoder.no_mask_embed(ops.arange(1)),
-                (7, 64, 64, 256),
+                (1, 1, 1, 256),
             )
             self.assertAllClose(dense_embeddings, no_mask_embed)
 
+    def test_prompt_encoder_no_mask_output_shape(self):
+        outputs = self.prompt_encoder(self.get_prompts(7, "points"))
+        output_shape = self.prompt_encoder.compute_output_shape(None)
+        for key, spec in output_shape.items():
+            shape = ops.convert_to_numpy(outputs[key]).shape
+            self.assertEqual(len(shape), len(spec))
+            for dim, spec_dim in zip(shape, spec):
+                if spec_dim is not None:
+                    self.assertEqual(dim, spec_dim)
+
     def test_two_way_multi_head_attention(self):
         image_embeddings = np.random.randn(1, 64, 64, 256).astype(np.float32)
 
@@ -218,6 +286,45 @@ class SAMTest(TestCase):
         self.assertEqual(iou_pred.shape, (1, 4))
         self.assertEqual(num_parameters, 4_058_340)
 
+    def test_mask_decoder_no_mask_prompt(self):
+        prompt_encoder_outputs = self.prompt_encoder(
+            self.get_prompts(3, "points")
+        )
+        sparse_embeddings, dense_embeddings, dense_positional_embeddings = (
+            prompt_encoder_outputs["sparse_embeddings"],
+            prompt_encoder_outputs["dense_embeddings"],
+            prompt_encoder_outputs["dense_positional_embeddings"],
+        )
+        self.assertEqual(
+            ops.convert_to_numpy(dense_embeddings).shape, (1, 1, 1, 256)
+        )
+        image_embeddings = np.random.randn(1, 64, 64, 256)
+        inputs = dict(
+            image_embeddings=image_embeddings,
+            image_pe=dense_positional_embeddings,
+            sparse_prompt_embeddings=sparse_embeddings,
+        )
+        outputs = self.mask_decoder(
+            dict(inputs, dense_prompt_embeddings=dense_embeddings)
+        )
+        # The "no mask" embedding has to give the same result as the fully
+        # broadcast embedding it stands in for.
+        outputs_broadcast = self.mask_decoder(
+            dict(
+                inputs,
+                dense_prompt_embeddings=ops.broadcast_to(
+                    dense_embeddings, (3, 64, 64, 256)
+                ),
+            )
+        )
+        masks, iou_pred = map(
+            ops.convert_to_numpy, [outputs["masks"], outputs["iou_pred"]]
+        )
+        self.assertEqual(masks.shape, (3, 4, 256, 256))
+        self.assertEqual(iou_pred.shape, (3, 4))
+        self.assertAllClose(masks, outputs_broadcast["masks"])
+        self.assertAllClose(iou_pred, outputs_broadcast["iou_pred"])
+
     @pytest.mark.large
     def test_end_to_end_model_predict(self):
         model = SegmentAnythingModel(